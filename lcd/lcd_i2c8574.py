@@ -7,6 +7,16 @@
 #    (corrected '\\' and '~' characters)  --> ~2.7 K memory consumption in Micropython
 #    (extended character set for )  --> ~3.2 K memory consumption in MP.
 #    (adapted for both MP and Circuitpython) --> ~3.5 K memory consumption in Circuitpython
+#    (HD44780 core with pluggable transports, buffered data writes; more transports in lcd_i2c8574_tr.py)
+#    (shadow of display contents, snapshot and restore)
+#
+# The transport classes move bytes to the HD44780. They have:
+#   .dl        0x10 for an 8 bit interface, 0x00 for 4 bit
+#   .backl     backlight state
+#   .begin()   initializes the bus and resets the HD44780 into its interface mode
+#   .wr(data, dbit)   writes one byte; dbit: 0..command, 1..data
+#   .wrs(buf, n)      writes the first n (max. 16) bytes of buf as data in one transfer
+#   .light(on)        switches the backlight
 
 try:
     from time import sleep_us
@@ -15,35 +25,113 @@ except ImportError:              # Circuitpython does not have sleep_us(), we us
     def sleep_us(us):
         sleep(us/1000000)
 
-# Implements a HD44780 character LCD connected via PCF8574 on I2C.
+# Transport: PCF8574 backpack on I2C, 4 bit interface.
+# The masks rs, en, bl give the pins of RS, E and backlight, d4 the pin number of D4 (D5..D7 follow).
+# The default is the common backpack mapping: P0 RS, P1 RW (low), P2 E, P3 backlight, P4..P7 D4..D7.
+# freq is the I2C frequency (max. 400 kHz for the PCF8574). The HD44780 needs 37 us per byte, which the 4 pin states
+# of a byte take up to ~1 MHz. Above that the last pin state is repeated, so that bursts are not too fast.
+class Pcf8574:
+    dl = 0x00
+
+    def __init__(self, i2c, addr=0x27, rs=0x01, en=0x04, bl=0x08, d4=4, freq=400000):  # default address of PCF8574 is 0x27
+        self.i2c = i2c
+        self.addr = addr
+        self.rs = rs
+        self.en = en
+        self.bl = bl
+        self.d4 = d4
+        self.backl = bl
+        self._r = max(4, (37 * freq + 8999999) // 9000000)  # Pin states per byte: 9 bit times each, >= 37 us in total
+        self._p = 0                                # Number of prefix bytes in self._b before the pin states
+        self._b = bytearray(1 + self._r*16)        # Transfer buffer: self._r pin states per byte, up to 16 bytes
+
+    def begin(self):
+        self._b[self._p] = 0
+        self._out(1)                               # Init I2C
+        sleep_us(20000)                            # Allow LCD time to powerup
+        for _ in range(3):                         # Send reset 3 times
+            self._nib(0x3)                         # LCD_FUNCTION_RESET
+            sleep_us(5000)                         # Need to delay at least 4.1 msec
+        self._nib(0x2)                             # LCD_FUNCTION, put LCD into 4 bit mode
+        sleep_us(1000)
+
+    def wr(self, data, dbit=0):
+        self._put(0, data, dbit)
+        self._out(self._r)
+
+    def wrs(self, buf, n):
+        for i in range(n):
+            self._put(self._r*i, buf[i], 1)
+        self._out(self._r*n)
+
+    def light(self, on):
+        self.backl = self.bl if on else 0
+        self._b[self._p] = self.backl
+        self._out(1)
+
+    # Puts the self._r pin states for writing byte data (high nibble first) at position j of the transfer buffer.
+    def _put(self, j, data, dbit):
+        b = self._b
+        j += self._p
+        b0 = (self.rs if dbit else 0) | self.backl
+        b1 = b0 | (data & 0x0f) << self.d4
+        b0 |= (data >> 4) << self.d4
+        b[j] = b0 | self.en            # Enable pulse: data is taken at falling edge of E
+        b[j+1] = b0
+        b[j+2] = b1 | self.en
+        for i in range(j+3, j+self._r):
+            b[i] = b1                  # Hold time till the HD44780 has processed the byte
+
+    # Writes a single nibble (during reset, without backlight).
+    def _nib(self, n):
+        b = n << self.d4
+        self._b[self._p] = b | self.en
+        self._b[self._p+1] = b
+        self._out(2)
+
+    def _out(self, n):
+        self.i2c.writeto(self.addr, memoryview(self._b)[:self._p+n])
+
+# Implements a HD44780 character LCD, by default connected via PCF8574 on I2C.
+# With tr another transport may be given (i2c and i2c_addr are ignored then).
 class I2cLcd:
 
-    def __init__(self, i2c, i2c_addr=0x27, dim=(16, 2), scroll=True):  # default address of PCF8574 is 0x27
+    def __init__(self, i2c, i2c_addr=0x27, dim=(16, 2), scroll=True, tr=None):  # default address of PCF8574 is 0x27
         self.i2c = i2c
         self.i2c_addr = i2c_addr
+        self.tr = tr if tr is not None else Pcf8574(i2c, i2c_addr)
         if not isinstance(dim, (tuple, list)) or len(dim) != 2:
             raise ValueError('I2cLcd: dim argument should be tuple or list, e.g. (16, 2)')
         self.nx = min(dim[0], 40)
         self.ny = min(dim[1], 4)
         self.scroll = scroll
-        if scroll:        # Create list of lines 1..ny that will store previously written chars to be rewritten 1 line higher at scrolling
-            self.lines = [bytearray(32 for _ in range(self.nx)) for l in range(self.ny -1)]  # 32 <-- ord(' ')
-        self.backl = 0x08
-        self.i2c.writeto(self.i2c_addr, bytearray([0]))          # Init I2C
-        sleep_us(20000)                                             # Allow LCD time to powerup
-        for _ in range(3):                                       # Send reset 3 times
-            self.i2c.writeto(self.i2c_addr, bytearray((0x34, 0x30))) # LCD_FUNCTION_RESET
-            sleep_us(5000)                                          # Need to delay at least 4.1 msec
-        self.i2c.writeto(self.i2c_addr, bytearray((0x24, 0x20))) # LCD_FUNCTION, put LCD into 4 bit mode
-        sleep_us(1000)
+        self.buf = bytearray(32 for _ in range(self.nx * self.ny))  # Shadow of the displayed chars, used for scrolling and restore()
+        self.cg = bytearray(64)    # Shadow of the 8 custom characters in CGRAM
+        self._a = 0                # Shadow address of the next data byte (in self.buf or self.cg)
+        self._cg = False           # Data goes to CGRAM
+        self._dc = 0x08            # Last LCD_ON_CTRL command (display, cursor, blink)
+        self._ob = bytearray(16)   # Output buffer of data bytes, sent in one transfer before the next command or when full
+        self._on = 0
+        self.tr.begin()
         self.set_display(False)
         self.clear()     # Sets class variables: self.x = 0; self.y = 0; self.nl = False; self.impl_nl = False
         self._wr(0x06)                           # LCD_ENTRY_MODE | LCD_ENTRY_INC
         self.set_cursor(False)
         self.set_display(True)                   # We might include a backlight option here
-        self._wr(0x28 if self.ny > 1 else 0x20)  # LCD_FUNCTION_2LINES if ny > 1 else LCD_FUNCTION
-        self.define_char(0, b'\x00\x10\x08\x04\x02\x01\x00\x00', 6)  # Character for '\\', which was Yen in Japanese ROM
-        self.define_char(0, b'\x00\x00\x00\x0d\x12\x00\x00\x00', 7)  # Character for '~', which was right arrow
+        self._wr(0x20 | self.tr.dl | (0x08 if self.ny > 1 else 0))  # LCD_FUNCTION | LCD_FUNCTION_2LINES if ny > 1
+        self._cgdef()
+        self.move_to(self.x, self.y)
+
+    # Defines the custom characters used by the driver.
+    def _cgdef(self):
+        self._defc(6, b'\x00\x10\x08\x04\x02\x01\x00\x00')  # Character for '\\', which was Yen in Japanese ROM
+        self._defc(7, b'\x00\x00\x00\x0d\x12\x00\x00\x00')  # Character for '~', which was right arrow
+
+    # Maps a character code to the code in the HD44780 ROM or CGRAM.
+    def _map(self, oc):
+        if oc ==  92: return 6       # select a better sign for \, which was yen, now defined as custom character 6
+        if oc == 126: return 7       # select a sign for ~, which was right arrow, now defined as custom character 7
+        return oc
 
     # Clears the LCD display and moves the cursor to the top left.
     def clear(self):
@@ -53,9 +141,16 @@ class I2cLcd:
         self.y = 0
         self.nl = False       # newline
         self.impl_nl = False  # implicit newline, to suppress an extra nl when a character in rightmost position is followed by \n
-        if self.scroll:       # in scroll mode also empty line buffer
-            for i in range(self.ny-1):
-                self.lines[i][:] = bytes(32 for _ in range(self.nx))  # 32 <-- ord(' ')
+
+    # Backlight state of the transport (0x08 or 0x00 with the default PCF8574 mapping), setting it switches the backlight.
+    @property
+    def backl(self):
+        return self.tr.backl
+
+    @backl.setter
+    def backl(self, on):
+        self._flush()
+        self.tr.light(on)
 
     # Causes the cursor to be made visible if show or even blink.
     def set_cursor(self, show=False, blink=False):
@@ -65,8 +160,8 @@ class I2cLcd:
     def set_display(self, on=True, backl=None):
         self._wr(0x0c if on else 0x08)     # LCD_ON_CTRL | LCD_ON_DISPLAY
         if backl is not None:
-            self.backl = 0x08 if backl else 0x00
-            self.i2c.writeto(self.i2c_addr, bytearray((self.backl,)))
+            self._flush()
+            self.tr.light(backl)
 
     # Moves the cursor to the indicated position, if cl_cpy: Delete rest of line or write from given buffer into line.
     def move_to(self, x, y, cl_cpy=False):
@@ -83,7 +178,7 @@ class I2cLcd:
             for _ in range(self.nx - x):
                 self._wr(32, 1)   # 32 <-- ord(' ')    # Clear the line that we moved to till the end
             self._wr(pos_c)                            #   and go back to the position that we moved to
-        elif isinstance(cl_cpy, (bytes, bytearray)):
+        elif cl_cpy:                                   # bytes, bytearray or memoryview
             for i in range(min(len(cl_cpy), self.nx-x)):
                 self._wr(cl_cpy[i], 1)                 # Write buffer from position till the end of line
             self._wr(pos_c)                            #   and go back to the position that we moved to
@@ -93,53 +188,226 @@ class I2cLcd:
     # May be used to write a single character with .write(c, end='').
     # A .write() (without argument) results in a newline.
     def write(self, string='', end='\n', wrap=True):
-        for c in ''.join((string, end)):
-            if c == '\n' and self.impl_nl:
-                self.impl_nl = False          # Consume nl if a character written in rightmost position already elicited an implicit nl
+        for c in string:
+            self._wc(ord(c), wrap)
+        for c in end:
+            self._wc(ord(c), wrap)
+        self._flush()
+
+    # Writes values formatted by fmt (str or bytes, bytes avoids any str objects) directly to the LCD, e.g.
+    #   lcd.write_fmt(b'T:%5.1d C %-4s', 235, 'ok')  -->  'T: 23.5 C ok  '
+    # Format specs: %[-][0][width][.prec]d|f|s and %%.  '-' aligns left, '0' pads numbers with zeros.
+    # d: int, with .prec a fixed-point number with prec decimals (235 -> 23.5).  f: float (allocates in Micropython),
+    # 6 decimals without .prec.  s: str or bytes, with .prec cut to prec characters.
+    def write_fmt(self, fmt, *vals, end='\n', wrap=True):
+        n = len(fmt)
+        i = 0
+        k = 0
+        while i < n:
+            c = self._code(fmt, i)
+            i += 1
+            if c != 37 or i == n:                        # 37 <-- ord('%')
+                self._wc(c, wrap)
                 continue
-            if self.nl or wrap and self.x >= self.nx:  # In case of a new wrap (prev. write with wrap=False) and overdue nl: newline before writing
-                if self.y < self.ny-1:                 # We were above the last line:
-                    self.move_to(0, self.y+1, True)    #    Clear next line and start from there
-                elif not self.scroll:                  # We were on the last line:
-                    self.move_to(0, 0, True)           #    Clear first line and start from there, if no scroll
-                else:
-                    for i, l in enumerate(self.lines):
-                        self.move_to(0, i, l)          # Write line buffer contents to upper lines
-                    self.move_to(0, self.ny-1, True)   #    and clear last line and start from there, if scroll
-                    l = self.lines.pop(0)              # Shift line buffer one line up
-                    l[:] = bytes(32 for _ in range(self.nx)) # 32 <-- ord(' ')
-                    self.lines.append(l)               #   and delete top line and append it below
-                self.nl = False
-            if c == '\n':
-                self.nl = True                # nl will be executed when next character arrives
+            left = zero = False
+            width = 0
+            prec = -1
+            c = self._code(fmt, i)
+            while c == 45 or c == 48:                    # '-', '0'
+                if c == 45: left = True
+                else: zero = True
+                i += 1
+                c = self._code(fmt, i)
+            while 48 <= c <= 57:                         # '0'..'9'
+                width = width * 10 + c - 48
+                i += 1
+                c = self._code(fmt, i)
+            if c == 46:                                  # '.'
+                prec = 0
+                i += 1
+                c = self._code(fmt, i)
+                while 48 <= c <= 57:
+                    prec = prec * 10 + c - 48
+                    i += 1
+                    c = self._code(fmt, i)
+            i += 1
+            if c == 37:
+                self._wc(37, wrap)
                 continue
-            if self.x < self.nx:
-                self.impl_nl = False          # Other character than \n after implicit newline makes it invalid
-                oc = ord(c)
-                if oc ==  92: oc = 6       # select a better sign for \, which was yen, now defined as custom character 6
-                if oc == 126: oc = 7       # select a sign for ~, which was right arrow, now defined as custom character 7
-                self._wr(oc, 1)
-                if self.scroll and self.y > 0:
-                    self.lines[self.y-1][self.x] = oc
-                self.x += 1
-            if wrap and self.x >= self.nx:
-                self.nl = True                # We signal the newline, but it is implicit
-                self.impl_nl = True
+            if k >= len(vals):
+                raise ValueError('I2cLcd: not enough values for write_fmt()')
+            v = vals[k]
+            k += 1
+            if c == 115:                                 # 's'
+                m = len(v) if prec < 0 else min(len(v), prec)
+                if not left:
+                    for _ in range(width - m): self._wc(32, wrap)
+                for j in range(m):
+                    self._wc(self._code(v, j), wrap)
+                if left:
+                    for _ in range(width - m): self._wc(32, wrap)
+            elif c == 100 or c == 102:                   # 'd', 'f'
+                if prec < 0:
+                    prec = 6 if c == 102 else 0          # Like printf: %f has 6 decimals
+                if c == 102:
+                    v = int(v * 10 ** prec + (0.5 if v >= 0 else -0.5))
+                self._wnum(v, width, prec, left, zero and not left, wrap)
+            else:
+                raise ValueError('I2cLcd: unknown format in write_fmt()')
+        for c in end:
+            self._wc(ord(c), wrap)
+        self._flush()
+
+    # Character code at position i of str or bytes fmt, 0 at the end.
+    @staticmethod
+    def _code(fmt, i):
+        if i >= len(fmt):
+            return 0
+        c = fmt[i]
+        return c if isinstance(c, int) else ord(c)
+
+    # Writes the integer v digit by digit, with prec digits behind a decimal point, padded to width.
+    def _wnum(self, v, width, prec, left, zero, wrap):
+        neg = v < 0
+        if neg:
+            v = -v
+        n = 1                       # Number of digits
+        d = 1                       # 10 ** (n-1)
+        while d * 10 <= v or n <= prec:
+            d *= 10
+            n += 1
+        pad = width - n - neg - (prec > 0)
+        if not left and not zero:
+            for _ in range(pad): self._wc(32, wrap)
+        if neg:
+            self._wc(45, wrap)
+        if zero:
+            for _ in range(pad): self._wc(48, wrap)
+        while d:
+            self._wc(48 + v // d % 10, wrap)
+            n -= 1
+            if n == prec and prec:
+                self._wc(46, wrap)  # '.'
+            d //= 10
+        if left:
+            for _ in range(pad): self._wc(32, wrap)
+
+    # Writes character code oc at the current cursor pos with newline, wrap and scroll logic.
+    def _wc(self, oc, wrap):
+        if oc == 10 and self.impl_nl:
+            self.impl_nl = False          # Consume nl if a character written in rightmost position already elicited an implicit nl
+            return
+        if self.nl or wrap and self.x >= self.nx:  # In case of a new wrap (prev. write with wrap=False) and overdue nl: newline before writing
+            if self.y < self.ny-1:                 # We were above the last line:
+                self.move_to(0, self.y+1, True)    #    Clear next line and start from there
+            elif not self.scroll:                  # We were on the last line:
+                self.move_to(0, 0, True)           #    Clear first line and start from there, if no scroll
+            else:
+                mv = memoryview(self.buf)
+                for i in range(self.ny-1):
+                    self.move_to(0, i, mv[(i+1)*self.nx:(i+2)*self.nx])  # Write contents of lower lines to upper lines
+                self.move_to(0, self.ny-1, True)   #    and clear last line and start from there, if scroll
+            self.nl = False
+        if oc == 10:
+            self.nl = True                # nl will be executed when next character arrives
+            return
+        if self.x < self.nx:
+            self.impl_nl = False          # Other character than \n after implicit newline makes it invalid
+            oc = self._map(oc)
+            self._wr(oc, 1)
+            self.x += 1
+        if wrap and self.x >= self.nx:
+            self.nl = True                # We signal the newline, but it is implicit
+            self.impl_nl = True
+
+    # Returns the display state as bytes: x, y, flags (newline, implicit newline, backlight), LCD_ON_CTRL,
+    # then the chars of all lines and the 8 custom characters.
+    def snapshot(self):
+        f = self.nl | self.impl_nl << 1 | (4 if self.tr.backl else 0)
+        return bytes((self.x, self.y, f, self._dc)) + self.buf + self.cg
+
+    # Restores a display state from snapshot(), sending only what differs from the current state.
+    def restore(self, snap):
+        n = len(self.buf)
+        if len(snap) != 4 + n + 64:
+            raise ValueError('I2cLcd: snapshot does not fit the display')
+        for k in range(8):                               # Custom characters
+            o = 4 + n + 8*k
+            if snap[o:o+8] != self.cg[8*k:8*k+8]:
+                self._defc(k, snap[o:o+8])
+        buf = self.buf
+        for y in range(self.ny):                         # Lines: runs of differing chars, a single equal char is rewritten
+            o = y * self.nx                              #   as that is cheaper than another move_to()
+            x = 0
+            while x < self.nx:
+                if snap[4+o+x] == buf[o+x]:
+                    x += 1
+                    continue
+                self.move_to(x, y)
+                while x < self.nx and (snap[4+o+x] != buf[o+x] or x+1 < self.nx and snap[5+o+x] != buf[o+x+1]):
+                    self._wr(snap[4+o+x], 1)
+                    x += 1
+        if bool(snap[2] & 4) != bool(self.tr.backl):
+            self._flush()                                # Restored chars go out before the backlight changes
+            self.tr.light(snap[2] & 4)
+        if snap[3] != self._dc:
+            self._wr(snap[3])
+        self.move_to(snap[0], snap[1])
+        self.nl = bool(snap[2] & 1)
+        self.impl_nl = bool(snap[2] & 2)
+        self._flush()
 
     # Write a character to one of the first 6 CGRAM locations, available as chr(0) through chr(5), xlocx is reserved for chr(6) and chr(7)
     def define_char(self, loc, cmap, xloc=0):                              #  we define characters \ and ~ by them
-        loc = max(min(loc, 5), xloc)
+        self._defc(max(min(loc, 5), xloc), cmap)
+        self.move_to(self.x, self.y)
+
+    # Write a character to CGRAM location loc. No delay between the bytes needed, the transports take >= 37 us per byte.
+    def _defc(self, loc, cmap):
         self._wr(0x40 | (loc << 3))  # LCD_CGRAM | ..
-        sleep_us(40)
         for i in range(8):
             self._wr(cmap[i], 1)
-            sleep_us(40)
-        self.move_to(self.x, self.y)
 
-    # Write to the LCD; dbit: 0..command, 1..data.
+    # Write to the LCD; dbit: 0..command, 1..data. Data is buffered, a command sends buffered data first.
+    # Keeps the shadow of DDRAM, CGRAM and LCD_ON_CTRL up to date.
     def _wr(self, data, dbit=0):
-        b0 = dbit | self.backl | data & 0xf0
-        b1 = dbit | self.backl | ((data & 0x0f) << 4)
-        self.i2c.writeto(self.i2c_addr, bytearray((b0 | 0x04, b0, b1 | 0x04, b1)))
-        if not dbit and data <= 3:            # The home and clear commands require a worst case delay of 4.1 msec
+        if dbit:
+            if self._cg:
+                self.cg[self._a & 0x3f] = data
+            elif self._a < len(self.buf):
+                self.buf[self._a] = data
+            self._a += 1
+            self._ob[self._on] = data
+            self._on += 1
+            if self._on == len(self._ob):
+                self._flush()
+            return
+        if data & 0x80:                  # LCD_DDRAM: position code back to index in self.buf
+            x = data & 0x3f
+            y = data >> 6 & 1
+            if x >= self.nx:
+                x -= self.nx
+                y += 2
+            self._a = y * self.nx + x
+            self._cg = False
+        elif data & 0x40:                # LCD_CGRAM
+            self._a = data & 0x3f
+            self._cg = True
+        elif data & 0xf8 == 0x08:        # LCD_ON_CTRL
+            self._dc = data
+        elif data <= 3:                  # LCD_CLR, LCD_HOME
+            if data == 1:
+                for i in range(len(self.buf)):
+                    self.buf[i] = 32
+            self._a = 0
+            self._cg = False
+        self._flush()
+        self.tr.wr(data)
+        if data <= 3:            # The home and clear commands require a worst case delay of 4.1 msec
             sleep_us(5000)
+
+    # Send the buffered data bytes.
+    def _flush(self):
+        if self._on:
+            self.tr.wrs(self._ob, self._on)
+            self._on = 0
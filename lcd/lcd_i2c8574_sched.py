@@ -0,0 +1,110 @@
+# Adaptive refresh scheduler on top of I2cLcd (lcd_i2c8574.py, lcd_i2c8574_m.py or lcd_i2c8574_x.py).
+#
+# The display is divided into regions (x, y, width), each with a priority and a maximum staleness in ms.
+# .update() only stores the new text of a region. .tick(), called regularly from the main loop, spends a
+# limited bus budget on the most urgent dirty regions: overdue regions (update older than max_ms) before
+# all others, among them and among the others higher priority first, then earlier deadline. So no region
+# waits much longer than its max_ms unless overdue regions of higher priority take the whole budget, and an
+# alarm field with a short max_ms is not starved by a full-screen redraw on a slow shared I2C bus.
+# Only the changed span of a region is sent. If it does not fit into the budget it is sent partially and
+# continued from there at the next tick. The cursor position of the lcd is restored after each tick.
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:              # Circuitpython does not have ticks_ms(), we use monotonic_ns() for that
+    from time import monotonic_ns
+    def ticks_ms():
+        return monotonic_ns() // 1000000
+    def ticks_diff(a, b):
+        return a - b
+
+# Scheduler class.
+class LcdScheduler:
+
+    # budget_us: bus time per tick, converted to bytes with the I2C frequency freq (9 bit times per byte incl. ack).
+    # budget_bytes: alternatively the number of bytes per tick directly.
+    def __init__(self, lcd, budget_us=5000, freq=100000, budget_bytes=None):
+        self.lcd = lcd
+        if budget_bytes is None:
+            budget_bytes = budget_us * freq // 9000000
+        self.nwr = max(budget_bytes // 5, 3)  # Every LCD command or character takes at most 5 bytes (address + 4 nibble bytes)
+        self.regs = []   # Regions: [x, y, width, prio, max_ms, shown text, wanted text, dirty since (ms) or None, resume column]
+
+    # Defines a region of width characters at (x, y), returns its id for .update().
+    # Higher prio is more urgent, max_ms is the maximum time an update may wait before it is overdue.
+    def region(self, x, y, width, prio=0, max_ms=1000):
+        if not (0 <= x < self.lcd.nx and 0 <= y < self.lcd.ny):
+            raise ValueError('LcdScheduler: region outside of display')
+        width = min(width, self.lcd.nx - x)
+        self.regs.append([x, y, width, prio, max_ms, '\n' * width, ' ' * width, ticks_ms(), 0])  # '\n' <-- unknown, never wanted
+        return len(self.regs) - 1
+
+    # Sets the text of region r (padded with blanks or cut to the region width). Nothing is sent before .tick().
+    def update(self, r, text):
+        reg = self.regs[r]
+        w = reg[2]
+        text = text.replace('\n', ' ')[:w]
+        text += ' ' * (w - len(text))
+        if text != reg[6]:
+            reg[6] = text
+            if reg[7] is None:
+                reg[7] = ticks_ms()
+
+    # Marks all regions as unknown, so they are completely rewritten, e.g. after lcd.clear().
+    def invalidate(self):
+        now = ticks_ms()
+        for reg in self.regs:
+            reg[5] = '\n' * reg[2]
+            reg[7] = now
+            reg[8] = 0
+
+    # Sends the most urgent changes within the bus budget. Returns True if changes are still pending.
+    def tick(self):
+        now = ticks_ms()
+        dirty = [reg for reg in self.regs if reg[7] is not None]
+        if not dirty:
+            return False
+        dirty.sort(key=lambda reg: self._urgency(reg, now))
+        nwr = self.nwr - 1                                # 1 move_to() to restore the cursor position
+        lcd = self.lcd
+        x0, y0, nl, impl_nl = lcd.x, lcd.y, lcd.nl, lcd.impl_nl
+        moved = False
+        pending = False
+        for reg in dirty:
+            x, y, w, _, _, shown, want, _, c = reg
+            a = 0
+            while a < w and shown[a] == want[a]:          # Find the changed span a..b
+                a += 1
+            b = w
+            while b > a and shown[b-1] == want[b-1]:
+                b -= 1
+            if a == b:
+                reg[7] = None
+                continue
+            if nwr < 2:                                   # Budget used up (1 move_to + at least 1 character)
+                pending = True
+                continue
+            if a < c < b:                                 # Continue a partially sent span first, the head may change again
+                a = c
+            n = min(b - a, nwr - 1)
+            lcd.move_to(x + a, y)
+            lcd.write(want[a:a+n], '')
+            moved = True
+            nwr -= n + 1
+            shown = reg[5] = shown[:a] + want[a:a+n] + shown[a+n:]
+            reg[8] = a + n if a + n < b else 0
+            if shown == want:
+                reg[7] = None
+            else:
+                pending = True
+        if moved:
+            lcd.move_to(x0, y0)                           # Back to where the application was writing
+            lcd.nl = nl
+            lcd.impl_nl = impl_nl
+        return pending
+
+    # Sort key: overdue first, then higher priority, then less time left till the deadline.
+    @staticmethod
+    def _urgency(reg, now):
+        left = reg[4] - ticks_diff(now, reg[7])
+        return (left > 0, -reg[3], left)
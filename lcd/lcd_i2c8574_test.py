@@ -45,6 +45,9 @@ _Write_Test_1 = True           # Short lines
 _Write_Test_2 = True           # Long lines
 _Write_Test_3 = True           # Lines with 20 characters
 _Write_Test_4 = True           # '\n\n\n', end='' and long line after move_to
+_Write_Fmt    = False          # write_fmt() without intermediate strings (ignored in minimal version)
+_Snapshot     = False          # snapshot() and restore() of display contents (ignored in minimal version)
+_Scheduler    = False          # Refresh of regions with priorities (needs lcd_i2c8574_sched.py)
 
 
 # ------------ Do a I2C Scan and check Address -------------------
@@ -294,4 +297,50 @@ if _Write_without_Scroll:
     sleep(1.5)
     write_tests()
 
+# ------ Formatted Write without intermediate Strings ----------
+if _Write_Fmt and _Driver_Version in ('Normal', 'Extended'):
+    print('-- Formatted Write --')
+    lcd.write('-Formatted Write-')
+    sleep(1.5)
+    for i in range(-50, 300, 7):
+        lcd.move_to(0, LCD_Dim[1]-1)
+        lcd.write_fmt(b'T:%6.1d C %-5s%3d', i, 'hot' if i > 250 else 'ok', i % 100, end='')  # i as fixed-point with 1 decimal
+        sleep(0.1)
+    sleep(2)
+    lcd.clear()
+
+# ------ Snapshot and Restore of Display Contents ----------
+if _Snapshot and _Driver_Version in ('Normal', 'Extended'):
+    print('-- Snapshot and Restore --')
+    lcd.write('-Snapshot, Restore-')
+    for i in range(1, LCD_Dim[1]):
+        lcd.write(f'Normal screen {i}', end='' if i == LCD_Dim[1]-1 else '\n')
+    sleep(1.5)
+    snap = lcd.snapshot()
+    for i in range(3):
+        lcd.move_to(2, 1)
+        lcd.write(' ALARM: Popup! ', end='')   # Overlay a popup
+        sleep(1)
+        lcd.restore(snap)                      # Only the overwritten characters are sent
+        sleep(1)
+    lcd.write()
+    sleep(2)
 
+# ------ Refresh Scheduler with Priorities ----------
+if _Scheduler:
+    from lcd_i2c8574_sched import LcdScheduler
+    print('-- Refresh Scheduler --')
+    lcd.clear()
+    sched = LcdScheduler(lcd, budget_us=5000, freq=100000)   # ~11 characters per tick at 100 kHz
+    rows = [sched.region(0, y, LCD_Dim[0], max_ms=2000) for y in range(1, LCD_Dim[1])]
+    alarm = sched.region(0, 0, LCD_Dim[0], prio=10, max_ms=100)
+    for i in range(30):
+        for j, r in enumerate(rows):
+            sched.update(r, f'Row {j+1} count {i+j}')
+        sched.update(alarm, 'ALARM!' if i % 10 > 4 else '')  # Alarm row is updated first, rows catch up later
+        sched.tick()
+        sleep(0.1)
+    while sched.tick():
+        sleep(0.1)
+    sleep(2)
+    lcd.clear()
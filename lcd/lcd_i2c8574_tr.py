@@ -0,0 +1,46 @@
+# Additional transports for I2cLcd in lcd_i2c8574.py (standard and extended driver), e.g.
+#   lcd = I2cLcd(None, dim=(16, 2), tr=Mcp23008(i2c))
+# In a separate file, so that users of the default PCF8574 backpack do not spend memory on them.
+
+from lcd_i2c8574 import Pcf8574
+
+# Transport: MCP23008 expander on I2C, 4 bit interface (8 pins are too few for 8 bit data plus RS and E).
+# The default mapping is that of the Adafruit I2C/SPI LCD backpack: GP1 RS, GP2 E, GP3..GP6 D4..D7, GP7 backlight.
+# All pin states of a transfer go to the GPIO register with sequential addressing disabled, which gives bursts
+# just like with the PCF8574. The MCP23008 allows up to 1.7 MHz: give the bus frequency as freq if it is above
+# 400 kHz, so that the pin states are repeated as needed for the 37 us per byte of the HD44780.
+class Mcp23008(Pcf8574):
+
+    def __init__(self, i2c, addr=0x20, rs=0x02, en=0x04, bl=0x80, d4=3, freq=400000):  # default address of MCP23008 is 0x20
+        super().__init__(i2c, addr, rs, en, bl, d4, freq)
+        self._p = 1
+        self._b[0] = 0x09                          # GPIO register
+
+    def begin(self):
+        self.i2c.writeto(self.addr, b'\x05\x20')   # IOCON: SEQOP, the register address is not incremented
+        self.i2c.writeto(self.addr, b'\x00\x00')   # IODIR: all pins are outputs
+        super().begin()
+
+# Transport: records all bytes instead of sending them, like an 8 bit parallel interface would get them.
+# For tests without hardware: .log holds pairs of bytes (dbit, data).
+class Recorder:
+    dl = 0x10
+
+    def __init__(self):
+        self.log = bytearray()
+        self.backl = True
+
+    def begin(self):
+        for _ in range(3):
+            self.wr(0x30)              # LCD_FUNCTION_RESET, 8 bit interface
+
+    def wr(self, data, dbit=0):
+        self.log.append(dbit)
+        self.log.append(data)
+
+    def wrs(self, buf, n):
+        for i in range(n):
+            self.wr(buf[i], 1)
+
+    def light(self, on):
+        self.backl = on